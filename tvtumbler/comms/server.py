@@ -122,6 +122,7 @@ class Service(object):
         return thetvdb.search_series_by_name(searchstring)
 
     def add_show(self, tvdb_id, followed=True, wanted_quality=quality.SD_COMP):
+        tv.invalidate(tvdb_id)
         show = tv.TvShow.from_tvdbd_id(tvdb_id)
         show.followed = followed
         show.wanted_quality = wanted_quality
@@ -7,44 +7,43 @@ This file is part of TvTumbler.
 @contact: info@tvtumbler.com
 '''
 
-from . import downloaders, feeders, logger, quality
+from . import downloaders, feeders, log, logger, quality
 
 
 def run():
     logger.debug('feeder - run')
     latest_downloadables = feeders.get_updates()
-    logger.debug('latest_downloadables: ' + repr(latest_downloadables))
+    logger.debug('%d downloadables found in feeds' % len(latest_downloadables))
 
     if not latest_downloadables:
         return
 
-    wanted = [s for s in latest_downloadables if s.wanted]
-
-    # Organize these by (tvdb_id, season, episode) so that we can eliminate duplicates.
-    # Our list is already sorted by preferred provider, so we'll get the better provider
-    # here for free.
-    wanted_dict = {}
-    for w in wanted:
+    # Check the download log for all the shows at once, rather than once for every episode.
+    downloaded = log.get_downloaded_episodes(set([ep.tvshow.tvdb_id for d in latest_downloadables
+                                                  for ep in d.episodes]))
+
+    # Pick the best downloadable for each (tvdb_id, season, episode), so that we eliminate duplicates.
+    # Our list is already sorted by preferred provider, so where qualities are equal we keep the
+    # first one seen, and get the better provider here for free.
+    wanted_dict = {}  # (tvdb_id, season, episode) -> (quality, downloadable)
+    for w in latest_downloadables:
+        if not w.is_wanted(downloaded):
+            continue
         qual = w.quality
         for ep in w.episodes:
             tvdb_id = ep.tvshow.tvdb_id
             for (season, episode) in ep.tvdb_episodes:
                 key = (tvdb_id, season, episode)
-                if not key in wanted_dict:
-                    wanted_dict[key] = {}
-                if not qual in wanted_dict[key]:
-                    wanted_dict[key][qual] = w
+                best = wanted_dict.get(key)
+                if (best is None or
+                    (qual != quality.UNKNOWN_QUALITY and
+                     (best[0] == quality.UNKNOWN_QUALITY or qual > best[0]))):
+                    wanted_dict[key] = (qual, w)
 
     if not wanted_dict:
         logger.debug('-' * 50)
         logger.info('No wanted downloads found in feeds')
         logger.debug('-' * 50)
     else:
-        for (tvdb_id, season, episode), dlables in wanted_dict.iteritems():
-            qualities = dlables.keys()
-            known_qualities = [q for q in qualities if q != quality.UNKNOWN_QUALITY]
-            if known_qualities:
-                use_dlable = dlables[max(known_qualities)]
-            else:
-                use_dlable = dlables[quality.UNKNOWN_QUALITY]
+        for (_, use_dlable) in wanted_dict.values():
             downloaders.download(use_dlable)
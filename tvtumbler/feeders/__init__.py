@@ -7,10 +7,17 @@ This file is part of TvTumbler.
 @contact: info@tvtumbler.com
 '''
 
+import Queue
+import threading
+import traceback
+
 from .. import events, logger
 
 _enabled_feeders = None
 
+# Maximum number of feeders to update at the same time (see get_updates()).
+MAX_UPDATE_WORKERS = 4
+
 
 def on_settings_changed():
     logger.debug('Settings changed, resetting enabled feeders')
@@ -46,14 +53,51 @@ def get_latest():
     return latest
 
 
-def get_updates():
+def get_updates(max_workers=MAX_UPDATE_WORKERS):
     '''
     Calls get_latest() on all active feeders *that are due an update* and concatenates the result
 
+    The feeds are fetched in parallel (up to max_workers at a time), as we spend most of our
+    time here waiting on the network.  The result is still ordered by feeder preference.
+
+    @param max_workers: (int) Maximum number of feeders to update at once.
     @return: ([Downloadable]) Returns a list of Downloadable's
     '''
+    due_feeders = [f for f in get_enabled_feeders() if f.is_update_due()]
+    if not due_feeders:
+        return []
+
+    results = {}  # index into due_feeders -> [Downloadable]
+    work_queue = Queue.Queue()
+    for i, f in enumerate(due_feeders):
+        work_queue.put((i, f))
+
+    def _worker():
+        while True:
+            try:
+                i, f = work_queue.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results[i] = f.get_latest()
+            except Exception, e:
+                logger.error(u'Exception while updating feeder %s: %s' % (f.get_name(), e))
+                logger.debug(traceback.format_exc())
+
+    num_workers = max(1, min(max_workers, len(due_feeders)))
+    if num_workers == 1:
+        # nothing to gain from another thread
+        _worker()
+    else:
+        workers = [threading.Thread(target=_worker,
+                                    name='%s-%d' % (threading.currentThread().getName(), n))
+                   for n in range(num_workers)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
     latest = []
-    for f in get_enabled_feeders():
-        if f.is_update_due():
-            latest.extend(f.get_latest())
+    for i in range(len(due_feeders)):
+        latest.extend(results.get(i, []))
     return latest
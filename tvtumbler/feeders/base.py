@@ -7,15 +7,163 @@ This file is part of TvTumbler.
 @contact: info@tvtumbler.com
 '''
 
+import calendar
+import re
+import threading
 import time, datetime
+import httplib
+from cStringIO import StringIO
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
 import feedparser  # @UnresolvedImport
+import requests  # @UnresolvedImport
 
-from .. import logger
+from .. import logger, utils
 from ..names import SceneNameParser
 from ..links import Downloadable, Torrent
 from ..numbering import SCENE_NUMBERING
 
 
+# Errors we can get reading a feed.  requests 1.x exceptions aren't IOError's, and httplib's
+# (BadStatusLine, IncompleteRead, ...) aren't either.
+_FEED_ERRORS = (IOError, httplib.HTTPException, ValueError, requests.RequestException)
+
+
+def _pub_date_to_local(published_parsed):
+    '''
+    Convert an rss item's pubDate (as already parsed by feedparser) to our usual naive local time.
+
+    @param published_parsed: (time.struct_time|None) feedparser's published_parsed, which is in UTC.
+    @return: (datetime.datetime|None) None if there's no usable date.
+    '''
+    if not published_parsed:
+        return None
+    try:
+        return datetime.datetime.fromtimestamp(calendar.timegm(published_parsed))
+    except (TypeError, ValueError, OverflowError), e:
+        logger.debug(u'unable to convert date %r: %s' % (published_parsed, e))
+        return None
+
+
+_BT_MIME = 'application/x-bittorrent'
+_TORRENT_URL_RE = re.compile(r'^magnet:|\.torrent(\?|$)')
+
+
+def _is_torrent_link(link):
+    '''
+    Does an rss enclosure or link (as parsed by feedparser) point to a torrent (or magnet)?
+
+    @param link: (dict)
+    @rtype: bool
+    '''
+    href = link.get('href')
+    return bool(href and (link.get('type') == _BT_MIME or _TORRENT_URL_RE.search(href)))
+
+
+def _add_url(urls, url):
+    '''
+    Append url to urls, unless it's empty or already there.
+    There are only ever a handful of urls per item, so a linear scan beats building a set.
+
+    @param urls: (list)
+    @param url: (str)
+    '''
+    if url and url not in urls:
+        urls.append(url)
+
+
+def _fetch_feed(rss_url, etag=None, modified=None):
+    '''
+    Fetch an rss feed.
+    If etag and/or modified are given, this is a conditional GET.
+
+    @param rss_url: (str)
+    @param etag: (str|None) The ETag header from the last time this feed was read.
+    @param modified: (str|None) The Last-Modified header from the last time this feed was read.
+    @return: (Response|None) The response, or None if the feed has not changed (HTTP 304).
+    '''
+    headers = {'User-Agent': utils.get_user_agent()}
+    if etag:
+        headers['If-None-Match'] = etag
+    if modified:
+        headers['If-Modified-Since'] = modified
+    r = requests.get(rss_url, headers=headers, timeout=60)
+    if r.status_code == 304:
+        return None
+    r.raise_for_status()
+    return r
+
+
+# How much of a feed we look at to decide if it's rss
+_SNIFF_BYTES = 1024
+
+
+def _looks_like_rss(content):
+    '''
+    Check that a feed looks like rss (2.0, or 1.0/rdf), before we go to the bother of parsing it.
+    Mirrors and proxies are fond of serving up html error pages with a 200.
+
+    @param content: (str) The feed, as fetched.
+    @rtype: bool
+    '''
+    head = content[:_SNIFF_BYTES].lower()
+    return '<rss' in head or '<rdf:rdf' in head
+
+
+def _iter_rss_entries(content, rss_url):
+    '''
+    Parse an rss feed, yielding a feedparser entry for each <item> as it is read.
+
+    Rather than have feedparser build the entire feed in memory, we read the feed with
+    ElementTree.iterparse and hand each item to feedparser on its own (discarding it after).
+    ElementTree is strict, so this raises SyntaxError (ParseError) on feeds that aren't well-formed xml.
+
+    @param content: (str) The feed, as fetched.
+    @param rss_url: (str) Where the feed came from (relative links in it are resolved against this).
+    @return: A generator of feedparser entries (dict-like).
+    '''
+    # feedparser names namespaced elements by the prefix that the feed declared first,
+    # so we need to keep the same prefixes when we serialize each item.
+    prefixes = {}  # uri -> prefix
+    for event, element in ElementTree.iterparse(StringIO(content), events=('start-ns', 'end')):
+        if event == 'start-ns':
+            prefix, uri = element
+            prefixes.setdefault(uri, prefix)
+        elif element.tag == 'item' or element.tag.endswith('}item'):  # rss 2.0 or 1.0
+            yield _parse_rss_item_element(element, prefixes, rss_url)
+            element.clear()
+
+
+def _parse_rss_item_element(element, prefixes, rss_url):
+    '''
+    Run a single <item> element through feedparser.
+
+    @param element: (Element) An rss <item>
+    @param prefixes: ({str: str}) namespace uri -> prefix, as declared in the feed.
+    @param rss_url: (str) Where the feed came from (relative links in it are resolved against this).
+    @return: (dict|None) The feedparser entry, or None if feedparser found none.
+    '''
+    for e in element.getiterator():
+        if e.tag.startswith('{'):
+            uri, local_name = e.tag[1:].split('}', 1)
+            prefix = prefixes.get(uri)
+            e.tag = (prefix + ':' + local_name) if prefix else local_name
+    xmlns = ''.join([' xmlns:%s="%s"' % (p, u) for (u, p) in prefixes.iteritems() if p])
+    doc = ('<rss version="2.0"%s><channel>' % (xmlns,) + ElementTree.tostring(element) +
+           '</channel></rss>')
+    entries = feedparser.parse(doc, response_headers={'content-location': rss_url})['entries']
+    return entries[0] if entries else None
+
+
+def _get_feeder_instance(cls):
+    '''
+    Unpickle helper (see BaseFeeder.__reduce__)
+    '''
+    return cls.get_instance()
+
+
 class BaseFeeder(object):
     """Base class for all feeders"""
 
@@ -27,9 +175,28 @@ class BaseFeeder(object):
         # Cache of latest entries (a list of Downloadable's)
         self._latest = []
 
+        # Which url _latest came from, and its validators (for conditional GETs)
+        self._latest_url = None
+        self._etag = None
+        self._modified = None
+
         # timestamp of last update
         self._last_update_timestamp = None
 
+        # guards _latest and _last_update_timestamp (feeders are updated in parallel)
+        self._update_lock = threading.Lock()
+
+        # These are needed for every rss item, so look them up just the once
+        self._nameparser_cls = self.get_nameparser()
+        self._numbering = self.get_numbering()
+
+    def __reduce__(self):
+        '''
+        Feeders are singletons (and hold a lock, which can't be pickled), so when a Downloadable is pickled
+        we just store which feeder it came from.
+        '''
+        return (_get_feeder_instance, (self.__class__,))
+
     @property
     def update_freq_secs(self):
         return 15 * 60  # our default is 15 minutes
@@ -85,13 +252,17 @@ class BaseFeeder(object):
 
         @return: ([Downloadable]) A list of Downloadable's
         '''
-        if self.is_update_due():
-            self._update()
+        with self._update_lock:
+            if self.is_update_due():
+                self._update()
 
-        return self._latest
+            return self._latest
 
     def _update(self):
         '''
+        Fetch the feed (trying each of rss_url in turn, if it's a list) and refresh _latest from it.
+
+        @return: (bool) True if a feed was read successfully, False otherwise.
         '''
         if isinstance(self.rss_url, basestring):
             urls = [self.rss_url, ]
@@ -99,21 +270,69 @@ class BaseFeeder(object):
             urls = self.rss_url
 
         self._last_update_timestamp = time.time()
-        self._latest = []
 
         for rss_url in urls:
-            feed = feedparser.parse(rss_url)
-            if feed:
-                for entry in feed.entries:
-                    i = self._parse_rss_item(entry)
-                    if i:
-                        if i.is_blacklisted():
-                            logger.debug('Ignoring this downloadable, it has been blacklisted: ' + repr(i))
-                        else:
-                            self._latest.append(i)
-                return True
+            if rss_url == self._latest_url:
+                etag, modified = self._etag, self._modified
+            else:
+                etag, modified = None, None
+
+            try:
+                r = _fetch_feed(rss_url, etag=etag, modified=modified)
+                if r is None:
+                    logger.debug(u'%s is unchanged since the last update' % (rss_url,))
+                    # No need to parse anything, but the blacklist may have changed since.
+                    self._latest = [i for i in self._latest if not i.is_blacklisted()]
+                    return True
+
+                content = r.content
+                if not _looks_like_rss(content):
+                    logger.notice(u'%s does not look like an rss feed, ignoring it' % (rss_url,))
+                    continue
+
+                try:
+                    latest = self._parse_rss_entries(_iter_rss_entries(content, rss_url))
+                except SyntaxError, e:
+                    # ElementTree's ParseError.  Plenty of feeds aren't well-formed xml (html entities
+                    # being the usual culprit), which feedparser copes with, so let it parse the lot.
+                    logger.debug(u'%s is not well-formed (%s), falling back to feedparser' % (rss_url, e))
+                    # Give it the same base url and charset it would have had fetching the feed itself.
+                    response_headers = {'content-location': rss_url}
+                    if r.headers.get('content-type'):
+                        response_headers['content-type'] = r.headers['content-type']
+                    latest = self._parse_rss_entries(feedparser.parse(content,
+                                                                      response_headers=response_headers)['entries'])
+            except _FEED_ERRORS, e:
+                logger.notice(u'Unable to read feed from %s: %s' % (rss_url, e))
+                continue
+
+            self._latest = latest
+            self._latest_url = rss_url
+            self._etag = r.headers.get('etag')
+            self._modified = r.headers.get('last-modified')
+            return True
+
+        self._latest = []
+        self._latest_url = None
         return False
 
+    def _parse_rss_entries(self, entries):
+        '''
+        Turn feedparser entries into Downloadable's, leaving out any that are blacklisted.
+
+        @param entries: (iterable) feedparser entries (dict-like).
+        @return: ([Downloadable])
+        '''
+        latest = []
+        for entry in entries:
+            i = self._parse_rss_item(entry) if entry else None
+            if i:
+                if i.is_blacklisted():
+                    logger.debug('Ignoring this downloadable, it has been blacklisted: ' + repr(i))
+                else:
+                    latest.append(i)
+        return latest
+
     def _parse_rss_item(self, item):
         '''
         RSS item (from _parse_rss_feed) to Downloadable.
@@ -148,73 +367,51 @@ class BaseFeeder(object):
 class TorrentFeeder(BaseFeeder):
     """Base class for all feeders that supply torrents"""
 
-    def _parse_rss_item(self, item):
+    def _parse_rss_item(self, item, override_title=None):
         '''
         RSS item (from _parse_rss_feed) to Torrent.
 
         @param item: (dict)
+        @param override_title: (str) Use this instead of the item's own title (for feeders that
+            need to clean up their titles first).  The item itself is never modified.
         @return: (Torrent|None) If the item does not have any known TvEpisodes, return None.
         '''
-        fileName = None
-        title = None
-        pubDate = None
-        urls = []
-        infoHash = None
-
         # logger.debug(repr(item))
         # logger.debug(repr(item.enclosures))
 
-        try:
-            fileName = item.filename
-        except (KeyError, AttributeError):
-            pass
+        fileName = item.get('filename')
+        title = override_title or item.get('title')
+        if not fileName and not title:
+            # Nothing for the name parser to work with
+            logger.debug(u'No name found in item')
+            return None
 
-        try:
-            magnet_uri = item.magneturi
-            if magnet_uri:
-                urls.append(magnet_uri)
-        except (KeyError, AttributeError):
-            pass
+        urls = []
+        # urls are kept unique as they are added, in the order the feed gives them
+        _add_url(urls, item.get('magneturi'))
 
-        try:
-            for enc in item.enclosures:
-                if (enc.type == 'application/x-bittorrent' or
-                    enc.href.startswith('magnet:') or
-                    enc.href.endwidth('.torrent')):
-                    urls.append(enc.href)
-        except (KeyError, AttributeError):
-            pass
+        for enc in item.get('enclosures', []):
+            if _is_torrent_link(enc):
+                _add_url(urls, enc['href'])
 
-        try:
-            for link in item.links:
-                if link.href.startswith('magnet:') or link.href.endswith('.torrent'):
-                    urls.append(link.href)
-        except (KeyError, AttributeError):
-            pass
+        for link in item.get('links', []):
+            if _is_torrent_link(link):
+                _add_url(urls, link['href'])
 
-        try:
-            title = item.title
-        except (KeyError, AttributeError):
-            pass
-
-        try:
-            pubDate = item.published_parsed
-        except (KeyError, AttributeError), e:
-            logger.debug('unable to parse date, using current timestamp instead:' + str(e))
+        pubDate = _pub_date_to_local(item.get('published_parsed'))
+        if pubDate is None:
+            logger.debug('no usable date, using current timestamp instead')
             pubDate = datetime.datetime.now()
 
-        try:
-            infoHash = item.infohash
-            if infoHash:
-                magnets = [k for k in urls if k.startswith('magnet:')]
-                if len(magnets) == 0:
-                    # If we have no magnet, but we have the infoHash, then make a magnet
-                    urls.append('magnet:?xt=urn:btih:' + infoHash)
-        except (KeyError, AttributeError):
-            pass
-
-        # remove any duplicate urls
-        urls = list(set(urls))
+        infoHash = item.get('infohash')
+        if infoHash:
+            magnets = [k for k in urls if k.startswith('magnet:')]
+            if len(magnets) == 0:
+                # If we have no magnet, but we have the infoHash, then make a magnet
+                _add_url(urls, 'magnet:?xt=urn:btih:' + infoHash)
+
+        # magnets go ahead of .torrent's (the sort is stable, so otherwise the feed's order is kept)
+        urls.sort(key=lambda u: not u.startswith('magnet:'))
 
         if len(urls) == 0:
             logger.debug(u'No useful links found in item')
@@ -229,8 +426,8 @@ class TorrentFeeder(BaseFeeder):
             parse_name = title
             has_ext = False
 
-        nameparser = self.get_nameparser()(parse_name, has_ext=has_ext,
-                                           numbering_system=self.get_numbering())
+        nameparser = self._nameparser_cls(parse_name, has_ext=has_ext,
+                                          numbering_system=self._numbering)
 
         if not nameparser.is_known:
             # Not parsable?  Fail
@@ -44,14 +44,15 @@ class PublicHDFeeder(TorrentFeeder):
         if not self._is_valid_category(item):
             return None
 
-        if item.title.startswith('[TORRENT] '):
-            item.title = item.title[10:]
+        new_title = item.get('title') or ''
+        if new_title.startswith('[TORRENT] '):
+            new_title = new_title[10:]
 
-        crudAtEndMatch = re.match(r'(.*) \[\w+\]$', item.title)
+        crudAtEndMatch = re.match(r'(.*) \[\w+\]$', new_title)
         if crudAtEndMatch:
-            item.title = crudAtEndMatch.group(1)
+            new_title = crudAtEndMatch.group(1)
 
-        torrent = super(PublicHDFeeder, self)._parse_rss_item(item)
+        torrent = super(PublicHDFeeder, self)._parse_rss_item(item, override_title=new_title)
 
         return torrent
 
@@ -7,6 +7,7 @@ This file is part of TvTumbler.
 @contact: info@tvtumbler.com
 '''
 
+import re
 import sys
 
 from .. import quality
@@ -15,6 +16,11 @@ from .base import TorrentFeeder
 
 __addon__ = sys.modules["__main__"].__addon__
 
+# Prefixes that ShowRSS puts on titles, and the quality each one tells us
+_SHOWRSS_PREFIXES = [(re.compile(r'^HD 720p: '), quality.HD720P_COMP),
+                     (re.compile(r'^HD 1080p: '), quality.HD1080P_COMP),
+                     ]
+
 
 class ShowRSSFeeder(TorrentFeeder):
 
@@ -50,12 +56,15 @@ class ShowRSSFeeder(TorrentFeeder):
         @param item: (dict)
         @return: (Torrent|None) If the item does not have any known TvEpisodes, return None.
         '''
-        if item.title.startswith('HD 720p: '):
-            item.title = item.title[9:]
-            known_quality = quality.HD720P_COMP
-        else:
-            known_quality = False
-        torrent = super(ShowRSSFeeder, self)._parse_rss_item(item)
+        new_title = item.get('title') or ''
+        known_quality = False
+        for (prefix_re, prefix_quality) in _SHOWRSS_PREFIXES:
+            prefix_match = prefix_re.match(new_title)
+            if prefix_match:
+                new_title = new_title[prefix_match.end():]
+                known_quality = prefix_quality
+                break
+        torrent = super(ShowRSSFeeder, self)._parse_rss_item(item, override_title=new_title)
         if torrent and torrent.quality == quality.UNKNOWN_QUALITY and known_quality:
             torrent.quality = known_quality
         return torrent
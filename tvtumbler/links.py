@@ -17,6 +17,9 @@ import re
 class Downloadable(object):
     '''Base class for all remote, download-able, links.'''
 
+    # We create one of these for every item in every feed, so do without the per-instance __dict__
+    __slots__ = ('_urls', '_episodes', '_name', '_quality', '_timestamp', '_feeder')
+
     def __init__(self, urls, episodes, name=None, quality=quality.UNKNOWN_QUALITY,
                  timestamp=datetime.datetime.now(), feeder=None):
         '''
@@ -36,6 +39,28 @@ class Downloadable(object):
         self._timestamp = timestamp
         self._feeder = feeder
 
+    def __getstate__(self):
+        '''
+        Return state (for pickling).
+        (objects with __slots__ can't be pickled without this)
+        '''
+        state = {}
+        for cls in self.__class__.__mro__:
+            for k in getattr(cls, '__slots__', ()):
+                if hasattr(self, k):
+                    state[k] = getattr(self, k)
+        return state
+
+    def __setstate__(self, state):
+        '''
+        Restore state (from pickle).
+        Also handles pickles from before we used __slots__ (where state is the old __dict__).
+
+        @param state: (dict)
+        '''
+        for k, v in state.iteritems():
+            setattr(self, k, v)
+
     def __repr__(self):
         return self.__class__.__name__ + '(urls=%s, episodes=%s, name=%s, quality=%s, timestamp=%s, feeder=%s)' % (
                     repr(self._urls),
@@ -130,8 +155,18 @@ class Downloadable(object):
 
     @property
     def wanted(self):
+        return self.is_wanted()
+
+    def is_wanted(self, downloaded=None):
+        '''
+        Do we want any of the episodes in this downloadable (in this quality)?
+
+        @param downloaded: Optional set of already downloaded episodes.  See TvEpisode.is_wanted_in_quality().
+        @type downloaded: set|None
+        @rtype: bool
+        '''
         for ep in self._episodes:
-            if ep.is_wanted_in_quality(self.quality):
+            if ep.is_wanted_in_quality(self.quality, downloaded=downloaded):
                 return True
         return False
 
@@ -182,6 +217,9 @@ class Downloadable(object):
 class Torrent(Downloadable):
     '''A torrent link'''
 
+    # both set lazily (see infohash and unique_key)
+    __slots__ = ('_infohash', '_unique_key')
+
     def _get_infohash(self):
         '''
         Getter for infohash property
@@ -370,4 +408,4 @@ class Torrent(Downloadable):
 
 class VOD(Downloadable):
     '''A download-able video-on-demand link'''
-    pass
+    __slots__ = ()
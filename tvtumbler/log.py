@@ -137,6 +137,36 @@ def was_downloaded(episode):
 
 
 
+def get_downloaded_episodes(tvdb_ids):
+    '''
+    Get all the successfully downloaded episodes for a number of shows, in a single query.
+    Use this instead of was_downloaded() when checking lots of episodes at once.
+
+    @param tvdb_ids: The shows to check
+    @type tvdb_ids: [int]
+    @return: A set of (tvdb_id, tvdb_season, tvdb_episode) tuples (all ints)
+    @rtype: set
+    '''
+    tvdb_ids = list(set([int(t) for t in tvdb_ids]))
+    downloaded = set()
+    if not tvdb_ids:
+        return downloaded
+
+    conn = _get_db()
+    # sqlite has a limit (999 by default) on the number of parameters, so do this in chunks
+    chunk_size = 500
+    for i in range(0, len(tvdb_ids), chunk_size):
+        chunk = tvdb_ids[i:i + chunk_size]
+        rows = conn.select('select distinct e.tvdb_id, e.tvdb_season, e.tvdb_episode '
+                           'from dl_log_episode e join dl_log l on (e.dl_log_id = l.id) '
+                           'where l.final_status = \'Downloaded\' '
+                           'and e.tvdb_id in (%s)' % (','.join(['?'] * len(chunk)),),
+                           chunk)
+        for r in rows:
+            downloaded.add((int(r[0]), int(r[1]), int(r[2])))
+    return downloaded
+
+
 def log_download_finish(download):
     conn = _get_db()
     try:
@@ -21,6 +21,24 @@ from ..tv import TvShow, TvEpisode
 from .scene_regexes import get_regexes, get_bad_regexes
 
 
+# These are used for every name we parse, so compile them just the once.
+_series_name_cleanups = [(re.compile("(\D)\.(?!\s)(\D)"), "\\1 \\2"),
+                         (re.compile("(\d)\.(\d{4})"), "\\1 \\2"),  # if it ends in a year then don't keep the dot
+                         (re.compile("(\D)\.(?!\s)"), "\\1 "),
+                         (re.compile("\.(?!\s)(\D)"), " \\1"),
+                         ]
+_trailing_hyphen_re = re.compile("-$")
+_extension_re = re.compile('(.*)\.\w{3,4}$')
+_year_end_re = re.compile('^(?P<show_name>.*?)\s\(?(?P<year>(19|20)\d\d)\)?$')
+_country_end_re = re.compile('^(?P<show_name>.*?)\s\(?(?P<cc>[a-zA-Z]{2})\)?$')
+_whitespace_re = re.compile('\s+')
+
+_roman_numerals = dict([(roman, i + 1) for (i, roman) in
+                        enumerate(['i', 'ii', 'iii', 'iv', 'v', 'vi', 'vii', 'viii', 'ix', 'x',
+                                   'xi', 'xii', 'xiii', 'xiv', 'xv', 'xvi', 'xvii', 'xviii', 'xix', 'xx',
+                                   'xxi', 'xxii', 'xxiii', 'xxiv', 'xxv', 'xxvi', 'xxvii', 'xxviii', 'xxix'])])
+
+
 class SceneNameParser(NameParser):
     '''
     A parser for Scene Names.
@@ -46,12 +64,10 @@ class SceneNameParser(NameParser):
         @return: (str)
         """
 
-        series_name = re.sub("(\D)\.(?!\s)(\D)", "\\1 \\2", series_name)
-        series_name = re.sub("(\d)\.(\d{4})", "\\1 \\2", series_name)  # if it ends in a year then don't keep the dot
-        series_name = re.sub("(\D)\.(?!\s)", "\\1 ", series_name)
-        series_name = re.sub("\.(?!\s)(\D)", " \\1", series_name)
+        for (cleanup_re, replacement) in _series_name_cleanups:
+            series_name = cleanup_re.sub(replacement, series_name)
         series_name = series_name.replace("_", " ")
-        series_name = re.sub("-$", "", series_name)
+        series_name = _trailing_hyphen_re.sub("", series_name)
         return series_name.strip()
 
     @classmethod
@@ -59,36 +75,9 @@ class SceneNameParser(NameParser):
         if type(number) == int:
             return number
 
-        # good lord I'm lazy
-        if number.lower() == 'i': return 1
-        if number.lower() == 'ii': return 2
-        if number.lower() == 'iii': return 3
-        if number.lower() == 'iv': return 4
-        if number.lower() == 'v': return 5
-        if number.lower() == 'vi': return 6
-        if number.lower() == 'vii': return 7
-        if number.lower() == 'viii': return 8
-        if number.lower() == 'ix': return 9
-        if number.lower() == 'x': return 10
-        if number.lower() == 'xi': return 11
-        if number.lower() == 'xii': return 12
-        if number.lower() == 'xiii': return 13
-        if number.lower() == 'xiv': return 14
-        if number.lower() == 'xv': return 15
-        if number.lower() == 'xvi': return 16
-        if number.lower() == 'xvii': return 17
-        if number.lower() == 'xviii': return 18
-        if number.lower() == 'xix': return 19
-        if number.lower() == 'xx': return 20
-        if number.lower() == 'xxi': return 21
-        if number.lower() == 'xxii': return 22
-        if number.lower() == 'xxiii': return 23
-        if number.lower() == 'xxiv': return 24
-        if number.lower() == 'xxv': return 25
-        if number.lower() == 'xxvi': return 26
-        if number.lower() == 'xxvii': return 27
-        if number.lower() == 'xxviii': return 28
-        if number.lower() == 'xxix': return 29
+        roman = _roman_numerals.get(number.lower())
+        if roman:
+            return roman
 
         return int(number)
 
@@ -109,7 +98,7 @@ class SceneNameParser(NameParser):
                                                   guess_from_extension=self._has_ext)
 
         if self._has_ext:
-            ext_match = re.match('(.*)\.\w{3,4}$', self._filename)
+            ext_match = _extension_re.match(self._filename)
             if ext_match and self._filename:
                 file_name = ext_match.group(1)
             else:
@@ -304,7 +293,7 @@ def get_tvdb_id(scene_name):
 
     # Does the name end in what looks like a year?
     # e.g. "Revolution 2012", or "Doctor Who (2005)"
-    year_end_match = re.match('^(?P<show_name>.*?)\s\(?(?P<year>(19|20)\d\d)\)?$', scene_name)
+    year_end_match = _year_end_re.match(scene_name)
     if year_end_match:
         logger.debug('looks like %s has a year at the end' % (scene_name,))
         new_scene_name = year_end_match.group('show_name')
@@ -327,7 +316,7 @@ def get_tvdb_id(scene_name):
 
     # also check for a country code at the end
     # e.g. "Wilfred (US)", or "Wilfred AU"
-    country_end_match = re.match('^(?P<show_name>.*?)\s\(?(?P<cc>[a-zA-Z]{2})\)?$', scene_name)
+    country_end_match = _country_end_re.match(scene_name)
     if country_end_match:
         logger.debug('looks like %s has a country code at the end' % (scene_name,))
         new_scene_name = country_end_match.group('show_name')
@@ -372,7 +361,7 @@ def simplify_show_name(showName):
     showName = showName.lower()
     # remove all whitespace (yes, even in the middle) - makes searching much
     # more reliable
-    showName = re.sub('\s+', '', showName)
+    showName = _whitespace_re.sub('', showName)
     return showName
 
 
@@ -7,6 +7,7 @@ This file is part of TvTumbler.
 @contact: info@tvtumbler.com
 '''
 
+import threading
 import time
 from .. import db, logger, utils
 import xbmc
@@ -48,21 +49,8 @@ def get_scene_numbering_from_xem(tvdb_id, tvdbSeason, tvdbEpisode):
     if tvdb_id is None or tvdbSeason is None or tvdbEpisode is None:
         return []
 
-    if _xem_refresh_needed(tvdb_id) and not xbmc.abortRequested:
-        _xem_refresh(tvdb_id)
-
-    db = _get_db()
-    rows = db.select('SELECT scene_season, scene_episode '
-                        'FROM xem_num '
-                        'WHERE tvdb_id = ? '
-                        'AND tvdb_season = ? AND tvdb_episode = ? '
-                        'ORDER BY scene_season ASC, scene_episode ASC',
-                        [tvdb_id, tvdbSeason, tvdbEpisode])
-    if rows:
-        return [(int(r["scene_season"]), int(r["scene_episode"]))
-                for r in rows]
-    else:
-        return []
+    tvdb_to_scene, scene_to_tvdb = _get_show_mappings(tvdb_id)
+    return list(tvdb_to_scene.get((int(tvdbSeason), int(tvdbEpisode)), []))
 
 
 def get_tvdb_numbering_from_xem(tvdb_id, sceneSeason, sceneEpisode):
@@ -79,22 +67,82 @@ def get_tvdb_numbering_from_xem(tvdb_id, sceneSeason, sceneEpisode):
     if tvdb_id is None or sceneSeason is None or sceneEpisode is None:
         return []
 
-    if _xem_refresh_needed(tvdb_id) and not xbmc.abortRequested:
-        _xem_refresh(tvdb_id)
+    tvdb_to_scene, scene_to_tvdb = _get_show_mappings(tvdb_id)
+    return list(scene_to_tvdb.get((int(sceneSeason), int(sceneEpisode)), []))
+
+
+# In-memory copy of the xem mappings for each show, so that we only go to the db once per show
+# (rather than once per episode).
+# str(tvdb_id) -> (expiry timestamp, {tvdb (s, e): [scene (s, e)]}, {scene (s, e): [tvdb (s, e)]})
+_show_mappings = {}
+SHOW_MAPPINGS_MAX_AGE_SECS = 60 * 60
+
+# Feeders run in parallel, and will often have the same show, so the refresh and load for each show is
+# serialized.  str(tvdb_id) -> Lock
+_show_locks = {}
+_show_locks_lock = threading.Lock()
+
+
+def _get_show_lock(key):
+    """
+    @param key: (str) str(tvdb_id)
+    @return: (Lock) The lock for the show.
+    """
+    with _show_locks_lock:
+        return _show_locks.setdefault(key, threading.Lock())
+
+
+def _get_show_mappings(tvdb_id):
+    """
+    Get all the xem mappings for a show, in both directions.
+    Refreshes/Loads as needed.
 
+    @param tvdb_id: int
+    @return: A tuple of two dicts: tvdb_to_scene and scene_to_tvdb.  Each maps a (season, episode) tuple to a
+             sorted list of (season, episode) tuples.  Both will be empty if there are no xem mappings.
+    """
+    key = str(tvdb_id)
+    cached = _show_mappings.get(key)
+    if cached and cached[0] > time.time():
+        return cached[1], cached[2]
+
+    with _get_show_lock(key):
+        # another thread may have loaded it while we waited
+        cached = _show_mappings.get(key)
+        if cached and cached[0] > time.time():
+            return cached[1], cached[2]
+
+        if _xem_refresh_needed(tvdb_id) and not xbmc.abortRequested:
+            _xem_refresh(tvdb_id)
+
+        return _load_show_mappings(tvdb_id)
+
+
+def _load_show_mappings(tvdb_id):
+    """
+    Load (and cache) the xem mappings for a show from the db.
+    Call with the show's lock held (see _get_show_mappings).
+
+    @param tvdb_id: int
+    @return: A tuple of two dicts: tvdb_to_scene and scene_to_tvdb (as for _get_show_mappings).
+    """
     db = _get_db()
-    rows = db.select('SELECT tvdb_season, tvdb_episode '
+    rows = db.select('SELECT tvdb_season, tvdb_episode, scene_season, scene_episode '
                      'FROM xem_num '
-                     'WHERE tvdb_id = ? '
-                     'AND scene_season = ? '
-                     'AND scene_episode = ? '
-                     'ORDER BY tvdb_season ASC, tvdb_episode ASC',
-                     [tvdb_id, sceneSeason, sceneEpisode])
-    if rows:
-        return [(int(r["tvdb_season"]), int(r["tvdb_episode"]))
-                for r in rows]
-    else:
-        return []
+                     'WHERE tvdb_id = ?',
+                     [tvdb_id])
+    tvdb_to_scene = {}
+    scene_to_tvdb = {}
+    for r in rows:
+        tvdb_ep = (int(r["tvdb_season"]), int(r["tvdb_episode"]))
+        scene_ep = (int(r["scene_season"]), int(r["scene_episode"]))
+        tvdb_to_scene.setdefault(tvdb_ep, []).append(scene_ep)
+        scene_to_tvdb.setdefault(scene_ep, []).append(tvdb_ep)
+    for eps in tvdb_to_scene.values() + scene_to_tvdb.values():
+        eps.sort()
+
+    _show_mappings[str(tvdb_id)] = (time.time() + SHOW_MAPPINGS_MAX_AGE_SECS, tvdb_to_scene, scene_to_tvdb)
+    return tvdb_to_scene, scene_to_tvdb
 
 
 def _xem_refresh_needed(tvdb_id):
@@ -141,32 +189,35 @@ def _xem_refresh(tvdb_id):
                 break  # stop at first success
 
         if result:
-            db = _get_db()
-            db.action('INSERT OR REPLACE INTO xem_refresh '
-                      '(tvdb_id, last_refreshed) '
-                      'VALUES (?,?)',
-                      [tvdb_id, time.time()])
+            # All in the one transaction, with the refresh timestamp last, so that nobody sees a half-written
+            # mapping (or a fresh timestamp with the old mapping gone).
+            sqls = []
             if result['result'] == 'success':
-                db.action("DELETE FROM xem_num where tvdb_id = ?", [tvdb_id])
+                sqls.append(["DELETE FROM xem_num where tvdb_id = ?", [tvdb_id]])
                 for entry in result['data']:
                     # 'scene' is always present, scene_2 is for doubles, etc.
                     for keyname in ('scene', 'scene_2', 'scene_3', 'scene_4'):
                         if keyname in entry:
-                            db.action('INSERT OR REPLACE INTO xem_num ('
-                                  'tvdb_id, '
-                                  'tvdb_season, '
-                                  'tvdb_episode, '
-                                  'scene_season, '
-                                  'scene_episode) '
-                                  'VALUES (?,?,?,?,?)',
-                                  [tvdb_id,
-                                   entry['tvdb']['season'],
-                                   entry['tvdb']['episode'],
-                                   entry[keyname]['season'],
-                                   entry[keyname]['episode']])
+                            sqls.append(['INSERT OR REPLACE INTO xem_num ('
+                                         'tvdb_id, '
+                                         'tvdb_season, '
+                                         'tvdb_episode, '
+                                         'scene_season, '
+                                         'scene_episode) '
+                                         'VALUES (?,?,?,?,?)',
+                                         [tvdb_id,
+                                          entry['tvdb']['season'],
+                                          entry['tvdb']['episode'],
+                                          entry[keyname]['season'],
+                                          entry[keyname]['episode']]])
             else:
                 logger.debug(u'No thexem.de for show %s with message "%s"'
                              % (tvdb_id, result['message']))
+            sqls.append(['INSERT OR REPLACE INTO xem_refresh '
+                         '(tvdb_id, last_refreshed) '
+                         'VALUES (?,?)',
+                         [tvdb_id, time.time()]])
+            _get_db().mass_action(sqls)
         else:
             logger.info(u"Empty lookup result - no data from thexem.de for %s"
                         % (tvdb_id,))
@@ -174,6 +225,9 @@ def _xem_refresh(tvdb_id):
         logger.warning(u"Exception while refreshing thexem data for " +
                        str(tvdb_id) + ": " + str(e))
 
+    # whatever we had cached for the show is out of date now
+    _show_mappings.pop(str(tvdb_id), None)
+
 
 # def get_all_xem_mappings_for_show(tvdb_id):
 #     """
@@ -53,6 +53,49 @@ quality_strings = {
                    }
 
 
+# quality_strings as regexes (best first), for quality_from_name().
+_quality_string_regexes = [(x, re.compile('\W' + quality_strings[x].replace(' ', '\W') + '\W', re.I))
+                           for x in sorted(quality_strings, reverse=True) if x != UNKNOWN_QUALITY]
+
+
+def _compile_all(patterns):
+    '''
+    @param patterns: ([str]) regex patterns
+    @return: ([regex]) patterns compiled (case-insensitive)
+    '''
+    return [re.compile(p, re.I) for p in patterns]
+
+
+# the patterns used by quality_from_name(), compiled once
+_hd_res_regexes = _compile_all(["(720|1080)[pi]"])
+_full_hd_res_regexes = _compile_all(["(1080)[pi]"])
+_sdtv_regexes = _compile_all(["(pdtv|hdtv|dsr|tvrip|web.dl|webrip).(xvid|x264)"])
+_sddvd_regexes = _compile_all(["(dvdrip|bdrip)(.ws)?.(xvid|divx|x264)"])
+_hdtv_regexes = _compile_all(["720p", "hdtv", "x264"])
+_hdtv_hr_regexes = _compile_all(["hr.ws.pdtv.x264"])
+_rawhdtv_regexes = _compile_all(["720p|1080i", "hdtv", "mpeg-?2"])
+_fullhdtv_regexes = _compile_all(["1080p", "hdtv", "x264"])
+_hdwebdl_regexes = _compile_all(["720p", "web.dl|webrip"])
+_hdwebdl_itunes_regexes = _compile_all(["720p", "itunes", "h.?264"])
+_fullhdwebdl_regexes = _compile_all(["1080p", "web.dl|webrip"])
+_fullhdwebdl_itunes_regexes = _compile_all(["1080p", "itunes", "h.?264"])
+_hdbluray_regexes = _compile_all(["720p", "bluray|hddvd", "x264"])
+_fullhdbluray_regexes = _compile_all(["1080p", "bluray|hddvd", "x264"])
+
+
+def _check_name(regexes, func, filename):
+    '''
+    Search filename with each of regexes, and combine the results with func.
+
+    @param regexes: ([regex]) compiled regexes
+    @param func: all or any
+    @param filename: (str)
+    @rtype: bool
+    '''
+    # a generator, so that all/any can stop early
+    return func(r.search(filename) for r in regexes)
+
+
 def quality_from_name(filename, guess_from_extension=True):
     '''
     Determine the quality from a filename.
@@ -64,34 +107,29 @@ def quality_from_name(filename, guess_from_extension=True):
     filename = os.path.basename(filename)
 
     # if we have our exact text then assume we put it there
-    for x in sorted(quality_strings, reverse=True):
-        if x == UNKNOWN_QUALITY:
-            continue
-
-        regex = '\W' + quality_strings[x].replace(' ', '\W') + '\W'
-        regex_match = re.search(regex, filename, re.I)
-        if regex_match:
+    for (x, regex) in _quality_string_regexes:
+        if regex.search(filename):
             return x
 
-    check_name = lambda alist, func: func([re.search(x, filename, re.I) for x in alist])
+    check_name = lambda alist, func: _check_name(alist, func, filename)
 
-    if check_name(["(pdtv|hdtv|dsr|tvrip|web.dl|webrip).(xvid|x264)"], all) and not check_name(["(720|1080)[pi]"], all):
+    if check_name(_sdtv_regexes, all) and not check_name(_hd_res_regexes, all):
         return SDTV
-    elif check_name(["(dvdrip|bdrip)(.ws)?.(xvid|divx|x264)"], any) and not check_name(["(720|1080)[pi]"], all):
+    elif check_name(_sddvd_regexes, any) and not check_name(_hd_res_regexes, all):
         return SDDVD
-    elif check_name(["720p", "hdtv", "x264"], all) or check_name(["hr.ws.pdtv.x264"], any) and not check_name(["(1080)[pi]"], all):
+    elif check_name(_hdtv_regexes, all) or check_name(_hdtv_hr_regexes, any) and not check_name(_full_hd_res_regexes, all):
         return HDTV
-    elif check_name(["720p|1080i", "hdtv", "mpeg-?2"], all):
+    elif check_name(_rawhdtv_regexes, all):
         return RAWHDTV
-    elif check_name(["1080p", "hdtv", "x264"], all):
+    elif check_name(_fullhdtv_regexes, all):
         return FULLHDTV
-    elif check_name(["720p", "web.dl|webrip"], all) or check_name(["720p", "itunes", "h.?264"], all):
+    elif check_name(_hdwebdl_regexes, all) or check_name(_hdwebdl_itunes_regexes, all):
         return HDWEBDL
-    elif check_name(["1080p", "web.dl|webrip"], all) or check_name(["1080p", "itunes", "h.?264"], all):
+    elif check_name(_fullhdwebdl_regexes, all) or check_name(_fullhdwebdl_itunes_regexes, all):
         return FULLHDWEBDL
-    elif check_name(["720p", "bluray|hddvd", "x264"], all):
+    elif check_name(_hdbluray_regexes, all):
         return HDBLURAY
-    elif check_name(["1080p", "bluray|hddvd", "x264"], all):
+    elif check_name(_fullhdbluray_regexes, all):
         return FULLHDBLURAY
 
     if guess_from_extension:
@@ -90,8 +90,8 @@ def purge_missing_shows():
     _db = _get_db()
     get_all_tvdb_ids.cache_clear()
 
-    from .tv import TvShow
-    xbmc_tvdb_ids = [str(t.tvdb_id) for t in TvShow.get_xbmc_shows()]
+    from . import tv
+    xbmc_tvdb_ids = [str(t.tvdb_id) for t in tv.TvShow.get_xbmc_shows()]
     not_followed_tvdb_ids = [str(r['tvdb_id']) for r in _db.select('SELECT tvdb_id '
                                                                    'FROM show_settings '
                                                                    'WHERE NOT follow')]
@@ -101,4 +101,5 @@ def purge_missing_shows():
             logger.debug('Deleting tvdb_id "%s" from settings' % (t,))
             if t in _show_settings_row_cache:
                 del _show_settings_row_cache[t]
+            tv.invalidate(t)
             _db.action('DELETE FROM show_settings WHERE tvdb_id = ?', [t])
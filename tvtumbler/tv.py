@@ -9,16 +9,38 @@ This file is part of TvTumbler.
 from dateutil import parser
 import os
 import sys
+from threading import Lock
 
 from tvtumbler import log
 import xbmc
 
-from . import jsonrpc, logger, downloaders, api, showsettings, thetvdb, tvrage, numbering
+from . import jsonrpc, logger, downloaders, api, showsettings, thetvdb, tvrage, numbering, events
 from .numbering import xem
 
 
 __addon__ = sys.modules["__main__"].__addon__
 
+# TvShow's loaded by from_tvdbd_id(), keyed by str(tvdb_id).
+_tvshow_cache = {}
+_tvshow_cache_lock = Lock()
+
+
+def invalidate(tvdb_id=None):
+    '''
+    Drop a show from the TvShow cache, so that it will be reloaded the next time it's needed.
+
+    @param tvdb_id: (int|str|None) The show to drop.  If None, the entire cache is flushed.
+    '''
+    global _tvshow_cache, _tvshow_cache_lock
+    with _tvshow_cache_lock:
+        if tvdb_id is None:
+            logger.debug('flushing _tvshow_cache')
+            _tvshow_cache = {}
+        else:
+            _tvshow_cache.pop(str(tvdb_id), None)
+
+events.add_event_listener(events.VIDEO_LIBRARY_UPDATED, invalidate)
+
 
 class TvShow(object):
 
@@ -72,6 +94,26 @@ class TvShow(object):
         If the show in known to xbmc, the details will be loaded from there.  If not
         an attempt will be made to load them from thetvdb.  If that fails None will be returned.
 
+        Shows are cached once loaded (see invalidate()).
+
+        @param tvdb_id: (int)
+        @return: (TvShow|None)
+        '''
+        global _tvshow_cache, _tvshow_cache_lock
+        key = str(tvdb_id)
+        show = _tvshow_cache.get(key)
+        if show is None:
+            show = cls._load_from_tvdb_id(tvdb_id)
+            if show is not None:
+                with _tvshow_cache_lock:
+                    _tvshow_cache[key] = show
+        return show
+
+    @classmethod
+    def _load_from_tvdb_id(cls, tvdb_id):
+        '''
+        Uncached implementation of from_tvdbd_id()
+
         @param tvdb_id: (int)
         @return: (TvShow|None)
         '''
@@ -673,13 +715,16 @@ class TvEpisode(object):
                 return True
         return False
 
-    def is_wanted_in_quality(self, qual):
+    def is_wanted_in_quality(self, qual, downloaded=None):
         '''
         @todo: FIXME!  This doesn't take into account yet if we have it in one quality, but want it
             in a higher one.
 
         @param qual: Quality to check against.  One of the constants in quality.py
         @type qual: int
+        @param downloaded: Optional set of (tvdb_id, tvdb_season, tvdb_episode) that have already been
+            downloaded (from log.get_downloaded_episodes()).  If None, the download log is queried directly.
+        @type downloaded: set|None
         @return: True if this is an episode we want in a quality we want.  False otherwise.
         @rtype: bool
         '''
@@ -688,7 +733,22 @@ class TvEpisode(object):
                 self._tvshow.wanted_quality & qual and
                 not self.episodeid and
                 not downloaders.is_downloading(self) and
-                not log.was_downloaded(self))
+                not self._was_downloaded(downloaded))
+
+    def _was_downloaded(self, downloaded=None):
+        '''
+        @param downloaded: See is_wanted_in_quality()
+        @type downloaded: set|None
+        @return: True only if all parts of the episode have been downloaded.
+        @rtype: bool
+        '''
+        if downloaded is None:
+            return log.was_downloaded(self)
+        tvdb_id = int(self._tvshow.tvdb_id)
+        for (s, e) in self.tvdb_episodes:
+            if (tvdb_id, int(s), int(e)) not in downloaded:
+                return False
+        return True
 
     def fake_local_filename(self, use_numbering, extension=''):
         '''